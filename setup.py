@@ -1,4 +1,15 @@
-from setuptools import setup, find_packages
+from setuptools import setup, find_packages, Extension
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    # the pure Python implementation is used when the extension is not built
+    ext_modules = []
+else:
+    ext_modules = cythonize(
+        [Extension('ullman._ullman', ['ullman/_ullman.pyx'])],
+        language_level=3,
+    )
 
 setup(
     name='UllmanSubgraph',
@@ -8,6 +19,7 @@ setup(
     long_description=open('README.md').read(),
     long_description_content_type='text/markdown',
     packages=find_packages(),
+    ext_modules=ext_modules,
     install_requires=['numpy', 'networkx', 'scipy'],
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -1,5 +1,8 @@
 import unittest
+from unittest import mock
 import networkx as nx
+import numpy as np
+from ullman import ullman_algorithm
 from ullman.ullman_algorithm import UllmanAlgorithm
 
 
@@ -31,6 +34,138 @@ class TestUllmanAlgorithm(unittest.TestCase):
         g2.add_edges_from([(3, 4)])
 
         self.assertFalse(UllmanAlgorithm(g1, g2).is_subgraph_isomorphic())
+    
+    def test_directed_input(self):
+        # directed graphs are accepted, but their edges are not fully checked;
+        # this only guards the degrees and the necessary conditions
+        g1 = nx.DiGraph([(0, 1), (1, 2), (2, 2)])
+        g2 = nx.DiGraph([(0, 1), (1, 2), (2, 3), (3, 0)])
+
+        ullman = UllmanAlgorithm(g1, g2)
+
+        self.assertEqual(list(ullman.degrees_g1), [deg for (_, deg) in g1.degree(ullman.nodes_g1)])
+        self.assertEqual(list(ullman.degrees_g2), [deg for (_, deg) in g2.degree(ullman.nodes_g2)])
+        self.assertIsInstance(ullman.is_subgraph_isomorphic(), bool)
+    
+    def test_subgraph4(self):
+        # g2 spans several 64-bit words of the bitset rows
+        g1 = nx.Graph()
+        g1.add_edges_from([(0, 1), (1, 2), (2, 0)])
+
+        g2 = nx.path_graph(130)
+        g2.add_edges_from([(70, 128)])
+
+        self.assertFalse(UllmanAlgorithm(g1, g2).is_subgraph_isomorphic())
+
+        g2.add_edges_from([(70, 129), (128, 129)])
+
+        self.assertTrue(UllmanAlgorithm(g1, g2).is_subgraph_isomorphic())
+    
+    def test_precomputed_adjacency(self):
+        g1 = nx.cycle_graph(4)
+        g2 = nx.complete_bipartite_graph(3, 3)
+        A1 = nx.to_numpy_array(g1, nodelist=sorted(g1.nodes()))
+        A2 = nx.to_scipy_sparse_array(g2, nodelist=sorted(g2.nodes()))
+
+        ullman = UllmanAlgorithm(g1, g2, A1, A2)
+
+        np.testing.assert_array_equal(ullman.A1, UllmanAlgorithm(g1, g2).A1)
+        np.testing.assert_array_equal(ullman.A2, UllmanAlgorithm(g1, g2).A2)
+        self.assertTrue(ullman.is_subgraph_isomorphic())
+
+        with self.assertRaises(ValueError):
+            UllmanAlgorithm(g1, g2, A1[:3, :3])
+    
+    def test_contiguous_layout(self):
+        g1 = nx.path_graph(5)
+        g2 = nx.gnp_random_graph(70, 0.2, seed=0)
+
+        ullman = UllmanAlgorithm(g1, g2)
+        F = ullman.init_future_matching_table()
+
+        for M in (ullman.A1, ullman.A2, ullman.A1_bits, ullman.A2_bits, F):
+            self.assertTrue(M.flags.c_contiguous)
+        for M in (ullman.A1_bits, ullman.A2_bits, F):
+            self.assertEqual(M.dtype, np.uint64)
+    
+    def test_future_matching_table(self):
+        # the centre of the star has a large enough degree for the inner
+        # nodes of the path (rows 0 and 1), but its neighbours are all leaves
+        g1 = nx.path_graph(4)
+        g2 = nx.star_graph(3)
+
+        ullman = UllmanAlgorithm(g1, g2)
+        F = ullman_algorithm._unpack_rows(ullman.init_future_matching_table())
+
+        self.assertEqual(ullman.nodes_g1[:2], [1, 2])
+        self.assertFalse(F[:2].any())
+        self.assertFalse(ullman.is_subgraph_isomorphic())
+    
+    def test_necessary_conditions(self):
+        # same number of nodes and edges, but g2 has no node of degree 3
+        g1 = nx.star_graph(3)
+        g2 = nx.path_graph(4)
+
+        with mock.patch.object(UllmanAlgorithm, '_search') as search:
+            self.assertFalse(UllmanAlgorithm(g1, g2).is_subgraph_isomorphic())
+            search.assert_not_called()
+    
+    def test_triangle_condition(self):
+        g1 = nx.complete_graph(3)
+        g2 = nx.cycle_graph(6)
+        g2.add_edges_from([(0, 2), (3, 5)])
+
+        with mock.patch.object(UllmanAlgorithm, '_search') as search:
+            self.assertFalse(UllmanAlgorithm(nx.complete_graph(4), g2).is_subgraph_isomorphic())
+            search.assert_not_called()
+
+        # g1 has no triangle, so those of g2 are not counted
+        with mock.patch.object(nx, 'triangles', wraps=nx.triangles) as triangles:
+            self.assertTrue(UllmanAlgorithm(nx.path_graph(3), g2).check_triangle_condition())
+            self.assertEqual(triangles.call_count, 1)
+
+        self.assertTrue(UllmanAlgorithm(g1, g2).check_triangle_condition())
+    
+    def test_result_cache(self):
+        g1 = nx.cycle_graph(3)
+        g2 = nx.complete_graph(4)
+
+        self.assertTrue(UllmanAlgorithm(g1, g2).is_subgraph_isomorphic())
+        with mock.patch.object(UllmanAlgorithm, '_search') as search:
+            self.assertTrue(UllmanAlgorithm(g1, g2).is_subgraph_isomorphic())
+            search.assert_not_called()
+    
+    def test_result_cache_key_size(self):
+        g1 = nx.path_graph(3)
+        small = UllmanAlgorithm(g1, nx.path_graph(10))._cache_key()
+        large = UllmanAlgorithm(g1, nx.path_graph(2000))._cache_key()
+
+        self.assertNotEqual(small, large)
+        self.assertEqual([len(part) for part in small[1::2]], [len(part) for part in large[1::2]])
+    
+    @unittest.skipIf(ullman_algorithm._compiled_search is None, 'extension not built')
+    def test_compiled_search(self):
+        for seed in range(20):
+            g1 = nx.gnp_random_graph(5, 0.5, seed=seed + 100)
+            g2 = nx.gnp_random_graph(10, 0.4, seed=seed)
+
+            compiled = UllmanAlgorithm(g1, g2)._search()
+            with mock.patch.object(ullman_algorithm, '_compiled_search', None):
+                fallback = UllmanAlgorithm(g1, g2)._search()
+
+            self.assertEqual(compiled, fallback)
+    
+    @unittest.skipIf(ullman_algorithm._compiled_search is None, 'extension not built')
+    def test_parallel_search(self):
+        g2 = nx.gnp_random_graph(40, 0.3, seed=0)
+        for g1 in (nx.cycle_graph(4), nx.complete_graph(6), g2.subgraph(range(8))):
+            serial = UllmanAlgorithm(g1, g2)._search()
+            for serial_roots in (0, 2):
+                with mock.patch.multiple(ullman_algorithm, MAX_WORKERS=4, PARALLEL_MIN_NODES=0,
+                                         PARALLEL_SERIAL_ROOTS=serial_roots, PARALLEL_MIN_ROOTS=1):
+                    parallel = UllmanAlgorithm(g1, g2)._search()
+
+                self.assertEqual(serial, parallel)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,246 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, initializedcheck=False
+"""
+Compiled search kernel for `UllmanAlgorithm`.
+
+The kernel runs the same search as `UllmanAlgorithm._ullman_iterative` on the
+same `uint64` bitset rows, but without the interpreter: the future matching
+table of every depth lives in one preallocated stack, candidate columns are
+enumerated with count-trailing-zeros, and the recursion runs without the GIL,
+so several searches can run on threads sharing one early-exit flag. Graphs of
+at most 64 nodes, whose bitset rows fit in one word, use a specialised version
+of the recursion.
+"""
+import numpy as np
+
+from libc.stdint cimport uint64_t
+from libc.string cimport memcpy, memset
+
+
+cdef extern from *:
+    """
+    #if defined(_MSC_VER)
+    #include <intrin.h>
+    static inline int ullman_ctz64(unsigned long long x) {
+        unsigned long i;
+        _BitScanForward64(&i, x);
+        return (int)i;
+    }
+    #else
+    static inline int ullman_ctz64(unsigned long long x) {
+        return __builtin_ctzll(x);
+    }
+    #endif
+    """
+    int ullman_ctz64(uint64_t x) nogil
+
+
+cdef bint _recurse(uint64_t* F_stack,
+                   const uint64_t* A1_bits,
+                   const uint64_t* A2_bits,
+                   int row,
+                   int n1,
+                   int words1,
+                   int words,
+                   volatile int* stop) noexcept nogil:
+    """
+    Maps `row` to every candidate column of `F_stack[row]` in turn, writing
+    the pruned table to `F_stack[row + 1]` before descending.
+
+    Deeper levels only read the rows after their own, so only the unmapped
+    rows are copied and row `row` itself is never written: reaching
+    `row == n1` already means every row got a distinct column.
+
+    Finding a mapping sets `stop`, and every level returns as soon as it sees
+    `stop` set by this or a concurrent search.
+    """
+    cdef Py_ssize_t size = <Py_ssize_t>n1 * words
+    cdef Py_ssize_t offset = <Py_ssize_t>(row + 1) * words
+    cdef uint64_t* F = F_stack + row * size
+    cdef uint64_t* F_tmp = F + size
+    cdef const uint64_t* a1 = A1_bits + <Py_ssize_t>row * words1
+    cdef const uint64_t* a2
+    cdef uint64_t candidates, mask, flip, alive
+    cdef int k, j, wi, col, col_word
+    cdef bint pruned
+
+    if stop[0]:
+        return False
+
+    if row == n1:
+        stop[0] = 1
+        return True
+
+    for k in range(words):
+        candidates = F[row * words + k]
+
+        while candidates:
+            col = (k << 6) | ullman_ctz64(candidates)
+            candidates &= candidates - 1
+
+            memcpy(F_tmp + offset, F + offset, (size - offset) * sizeof(uint64_t))
+
+            # drop `col` from the domains of the unmapped rows and apply
+            # check_constraint, keeping the neighbours of `col` for rows
+            # adjacent to `row` and its non-neighbours otherwise
+            col_word = col >> 6
+            mask = (<uint64_t>1) << (col & 63)
+            a2 = A2_bits + <Py_ssize_t>col * words
+            pruned = False
+            for wi in range(row + 1, n1):
+                F_tmp[wi * words + col_word] &= ~mask
+                flip = ((a1[wi >> 6] >> (wi & 63)) & 1) - 1
+                alive = 0
+                for j in range(words):
+                    F_tmp[wi * words + j] &= a2[j] ^ flip
+                    alive |= F_tmp[wi * words + j]
+                if alive == 0:
+                    pruned = True
+                    break
+
+            if pruned:
+                # backtrack
+                continue
+
+            if _recurse(F_stack, A1_bits, A2_bits, row + 1, n1, words1, words, stop):
+                return True
+
+    return False
+
+
+cdef bint _recurse_word(uint64_t* F_stack,
+                        const uint64_t* A1_bits,
+                        const uint64_t* A2_bits,
+                        int row,
+                        int n1,
+                        volatile int* stop) noexcept nogil:
+    """
+    `_recurse` specialised for graphs of at most 64 nodes, where every bitset
+    row is a single word: there is no loop over words, and the copy of each
+    unmapped row is fused with its pruning.
+    """
+    cdef uint64_t* F = F_stack + <Py_ssize_t>row * n1
+    cdef uint64_t* F_tmp = F + n1
+    cdef uint64_t a1 = A1_bits[row]
+    cdef uint64_t candidates = F[row]
+    cdef uint64_t keep, clear, flip
+    cdef int wi, col
+    cdef bint pruned
+
+    if stop[0]:
+        return False
+
+    if row == n1:
+        stop[0] = 1
+        return True
+
+    while candidates:
+        col = ullman_ctz64(candidates)
+        candidates &= candidates - 1
+
+        keep = A2_bits[col]
+        clear = ~((<uint64_t>1) << col)
+        pruned = False
+        for wi in range(row + 1, n1):
+            flip = ((a1 >> wi) & 1) - 1
+            F_tmp[wi] = F[wi] & (keep ^ flip) & clear
+            if F_tmp[wi] == 0:
+                pruned = True
+                break
+
+        if pruned:
+            # backtrack
+            continue
+
+        if _recurse_word(F_stack, A1_bits, A2_bits, row + 1, n1, stop):
+            return True
+
+    return False
+
+
+cdef bint _search(uint64_t[:, :, ::1] F_stack,
+                  const uint64_t[:, ::1] A1_view,
+                  const uint64_t[:, ::1] A2_view,
+                  int n1,
+                  int words1,
+                  int words,
+                  int* stop) noexcept nogil:
+    """
+    Starts the recursion matching the word count of the bitset rows.
+    """
+    if words == 1 and words1 == 1:
+        return _recurse_word(&F_stack[0, 0, 0], &A1_view[0, 0], &A2_view[0, 0],
+                             0, n1, <volatile int*>stop)
+    return _recurse(&F_stack[0, 0, 0], &A1_view[0, 0], &A2_view[0, 0],
+                    0, n1, words1, words, <volatile int*>stop)
+
+
+def search(F, A1_bits, A2_bits, stop=None, roots=None):
+    """
+    Runs the Ullman search from an initial future matching table.
+
+    Parameters:
+    -----------
+    F : np.ndarray
+        The initial future matching table, as `uint64` bitset rows.
+    A1_bits : np.ndarray
+        The adjacency matrix of `g1`, as `uint64` bitset rows.
+    A2_bits : np.ndarray
+        The adjacency matrix of `g2`, as `uint64` bitset rows.
+    stop : np.ndarray, optional
+        A one-element `intc` array shared by concurrent searches. It is set
+        when a mapping is found, and a search seeing it set gives up.
+    roots : np.ndarray, optional
+        Candidate columns of the first row to try, one after the other, in
+        place of the first row of `F`. All of them share one stack, and `stop`
+        is checked before each.
+
+    Returns:
+    --------
+    bool
+        True if an isomorphic subgraph is found, False otherwise.
+    """
+    cdef const uint64_t[:, ::1] F_view = np.ascontiguousarray(F, dtype=np.uint64)
+    cdef const uint64_t[:, ::1] A1_view = np.ascontiguousarray(A1_bits, dtype=np.uint64)
+    cdef const uint64_t[:, ::1] A2_view = np.ascontiguousarray(A2_bits, dtype=np.uint64)
+    cdef int n1 = F_view.shape[0]
+    cdef int words = F_view.shape[1]
+    cdef int words1 = A1_view.shape[1]
+    cdef uint64_t[:, :, ::1] F_stack
+    cdef int[::1] stop_view
+    cdef const Py_ssize_t[::1] roots_view
+    cdef Py_ssize_t i, col
+    cdef bint found = False
+
+    if n1 == 0:
+        return True
+    if A2_view.shape[0] == 0:
+        return False
+
+    if stop is None:
+        stop = np.zeros(1, dtype=np.intc)
+    stop_view = stop
+    if stop_view[0]:
+        return False
+
+    stack = np.empty((n1 + 1, n1, words), dtype=np.uint64)
+    stack[0] = F_view
+    F_stack = stack
+
+    if roots is None:
+        with nogil:
+            found = _search(F_stack, A1_view, A2_view, n1, words1, words, &stop_view[0])
+        return found
+
+    roots_view = np.ascontiguousarray(roots, dtype=np.intp)
+    with nogil:
+        for i in range(roots_view.shape[0]):
+            if stop_view[0]:
+                break
+            col = roots_view[i]
+            memset(&F_stack[0, 0, 0], 0, words * sizeof(uint64_t))
+            F_stack[0, 0, col >> 6] = (<uint64_t>1) << (col & 63)
+            if _search(F_stack, A1_view, A2_view, n1, words1, words, &stop_view[0]):
+                found = True
+                break
+
+    return found
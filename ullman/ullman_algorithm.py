@@ -1,6 +1,186 @@
+import hashlib
+import os
+import threading
 import networkx as nx
 import numpy as np
-from typing import List
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from scipy import sparse
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    from ullman._ullman import search as _compiled_search
+except ImportError:
+    # extension not built, fall back to `UllmanAlgorithm._ullman_iterative`
+    _compiled_search = None
+
+
+WORD_BITS = 64
+
+# on targets with at least `PARALLEL_MIN_NODES` nodes, the compiled search tries
+# the first `PARALLEL_SERIAL_ROOTS` candidates of the first row serially, then
+# splits the others over `MAX_WORKERS` threads if each gets at least
+# `PARALLEL_MIN_ROOTS` of them
+MAX_WORKERS = os.cpu_count() or 1
+PARALLEL_MIN_NODES = 128
+PARALLEL_SERIAL_ROOTS = 8
+PARALLEL_MIN_ROOTS = 4
+
+# least recently used results of `UllmanAlgorithm.is_subgraph_isomorphic`
+RESULT_CACHE_SIZE = 4096
+_result_cache: OrderedDict = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+
+def _pack_rows(M: np.ndarray) -> np.ndarray:
+    """
+    Packs each row of a binary matrix into a bitset of `uint64` words.
+
+    Bit `j % 64` of word `j // 64` in row `i` is set iff `M[i, j] != 0`.
+    Rows are zero-padded up to a whole number of words, so there is always
+    at least one word per row.
+
+    Parameters:
+    -----------
+    M : np.ndarray
+        A binary matrix of shape `(n, m)`.
+
+    Returns:
+    --------
+    np.ndarray
+        A `uint64` array of shape `(n, ceil(m / 64))`.
+    """
+    M = np.asarray(M)
+    n, m = M.shape
+    words = max(1, -(-m // WORD_BITS))
+    packed = np.zeros((n, words * WORD_BITS // 8), dtype=np.uint8)
+    packed[:, :-(-m // 8)] = np.packbits(M != 0, axis=1, bitorder='little')
+    return packed.view('<u8').astype(np.uint64, order='C')
+
+
+def _unpack_rows(bits: np.ndarray) -> np.ndarray:
+    """
+    Unpacks `uint64` bitsets into a binary `uint8` matrix (padding included).
+
+    Parameters:
+    -----------
+    bits : np.ndarray
+        A `uint64` array of shape `(n, words)` or `(words,)`.
+
+    Returns:
+    --------
+    np.ndarray
+        A binary matrix of shape `(n, 64 * words)` or `(64 * words,)`.
+    """
+    as_bytes = np.ascontiguousarray(bits, dtype='<u8').view(np.uint8)
+    return np.unpackbits(as_bytes, axis=-1, bitorder='little')
+
+
+def _iter_bits(bits: np.ndarray) -> Iterator[int]:
+    """
+    Yields the indices of the set bits of a `uint64` bitset row in increasing order.
+
+    Each word is scanned by isolating its lowest set bit (`w & -w`) and then
+    clearing it, so the cost is one step per set bit rather than per column.
+
+    Parameters:
+    -----------
+    bits : np.ndarray
+        A `uint64` array of shape `(words,)`.
+    """
+    for k, w in enumerate(bits.tolist()):
+        while w:
+            low = w & -w
+            yield k * WORD_BITS + low.bit_length() - 1
+            w ^= low
+
+
+def _adjacency(g: nx.Graph,
+               nodelist: List,
+               A: Optional[np.ndarray] = None) -> Tuple[sparse.csr_array, np.ndarray]:
+    """
+    Builds the unweighted adjacency matrix of a graph along with its degrees.
+
+    A precomputed adjacency matrix, dense or sparse, is used as is instead of
+    being rebuilt from `g`; only its nonzero pattern matters.
+
+    The degrees are read off the CSR structure instead of iterating over
+    `g.degree()`, matching NetworkX: a self-loop counts twice, and the degree
+    of a node in a directed graph is its in-degree plus its out-degree. The
+    matrix is cast to `uint8` after conversion, as NetworkX corrects self-loop
+    entries with negative values while building it.
+
+    Parameters:
+    -----------
+    g : nx.Graph
+        The graph.
+    nodelist : List
+        The node order of the rows and columns.
+    A : np.ndarray or sparse array, optional
+        The precomputed adjacency matrix of `g`, in the order of `nodelist`.
+
+    Returns:
+    --------
+    Tuple[sparse.csr_array, np.ndarray]
+        The `uint8` CSR adjacency matrix and the degree of each node.
+    """
+    if A is None:
+        A = nx.to_scipy_sparse_array(g, nodelist=nodelist, weight=None, format='csr')
+    elif A.shape != (len(nodelist), len(nodelist)):
+        raise ValueError(f'expected an adjacency matrix of shape {(len(nodelist), len(nodelist))}, got {A.shape}')
+    A = sparse.csr_array(A != 0, dtype=np.uint8)
+    if g.is_directed():
+        degrees = np.diff(A.indptr) + np.bincount(A.indices, minlength=A.shape[0])
+    else:
+        degrees = np.diff(A.indptr) + A.diagonal()
+    return A, degrees
+
+
+def _neighbour_degrees(A: sparse.csr_array,
+                       degrees: np.ndarray,
+                       width: int) -> np.ndarray:
+    """
+    Tabulates the degrees of the neighbours of each node in descending order.
+
+    Rows of nodes with fewer than `width` neighbours are padded with -1, so a
+    padded entry of a `g1` node is dominated by anything and a padded entry of
+    a `g2` node dominates nothing. The table is gathered from the CSR entries
+    only, so it costs one sort of the `m` stored neighbours rather than of `n`
+    dense rows, and uses the narrowest signed integer type holding the degrees.
+
+    Parameters:
+    -----------
+    A : sparse.csr_array
+        The adjacency matrix of the graph, of shape `(n, n)`.
+    degrees : np.ndarray
+        The degree of each node, in the node order of `A`.
+    width : int
+        The number of neighbour degrees kept per node (the largest ones).
+
+    Returns:
+    --------
+    np.ndarray
+        An array of shape `(n, width)`.
+    """
+    n = A.shape[0]
+    dtype = np.min_scalar_type(-int(np.max(degrees, initial=0)) - 1)
+    rows = np.repeat(np.arange(n), np.diff(A.indptr))
+    cols = A.indices
+
+    # self-loops are not neighbours
+    rows, cols = rows[rows != cols], cols[rows != cols]
+    values = degrees[cols].astype(dtype)
+
+    # descending degrees within each row, rows kept in order
+    order = np.lexsort((-values.astype(np.int64), rows))
+    rows, values = rows[order], values[order]
+    starts = np.searchsorted(rows, np.arange(n))
+    position = np.arange(len(rows)) - starts[rows]
+    top = position < width
+
+    table = np.full((n, width), -1, dtype=dtype)
+    table[rows[top], position[top]] = values[top]
+    return table
 
 
 class UllmanAlgorithm:
@@ -9,12 +189,34 @@ class UllmanAlgorithm:
 
     This algorithm checks whether graph `g1` is subgraph isomorphic to graph `g2`.
 
+    Only undirected graphs are fully supported. Directed graphs are accepted, but
+    `check_constraint` only compares the edges from each mapped node to the
+    nodes mapped after it, so edges in the other direction are not checked and
+    the result may depend on the node order.
+
     Attributes:
     -----------
     g1 : nx.Graph
         The source graph.
     g2 : nx.Graph
         The target raph.
+    nodes_g1 : list
+        The nodes of `g1` in search order, by descending degree (ties by node).
+        Row `i` of `A1` and `F` corresponds to `nodes_g1[i]`.
+    nodes_g2 : list
+        The nodes of `g2` in sorted order, one per column of `F`.
+    A1_sparse, A2_sparse : sparse.csr_array
+        The unweighted `uint8` adjacency matrices in CSR form, in the node
+        orders above.
+    A1, A2 : np.ndarray
+        The same adjacency matrices, dense.
+    degrees_g1, degrees_g2 : np.ndarray
+        The node degrees, in the node orders above.
+    A1_bits, A2_bits : np.ndarray
+        The adjacency matrices packed row-wise into `uint64` bitsets.
+
+    All matrices are C-contiguous, so every row scanned by the search is a
+    contiguous block and the compiled kernel can use them without copying.
     
     Methods:
     --------
@@ -22,13 +224,20 @@ class UllmanAlgorithm:
     update_F : None
     is_F_valid_isomorphism : bool
     check_constraint : None
-    _ullman_recursive : bool
+    check_necessary_conditions : bool
+    check_triangle_condition : bool
+    _ullman_iterative : bool
+    _parallel_search : bool
+    _search : bool
+    _cache_key : tuple
     is_subgraph_isomorphic : bool
     """
 
     def __init__(self,
                  g1: nx.Graph,
-                 g2: nx.Graph) -> None:
+                 g2: nx.Graph,
+                 A1: Optional[np.ndarray] = None,
+                 A2: Optional[np.ndarray] = None) -> None:
         """
         Initializes the UllmanAlgorithm with two graphs.
 
@@ -38,29 +247,59 @@ class UllmanAlgorithm:
             The source graph.
         g2 : nx.Graph
              The target graph.
+        A1 : np.ndarray or sparse array, optional
+            The precomputed adjacency matrix of `g1`, with nodes in sorted order.
+            Built from `g1` if not given.
+        A2 : np.ndarray or sparse array, optional
+            The precomputed adjacency matrix of `g2`, with nodes in sorted order.
+            Built from `g2` if not given.
         """
         self.g1 = g1
         self.g2 = g2
-        self.A1 = nx.adjacency_matrix(g1, nodelist=sorted(g1.nodes())).todense()
-        self.A2 = nx.adjacency_matrix(g2, nodelist=sorted(g2.nodes())).todense()
+        nodes_g1 = sorted(g1.nodes())
+        A1_sparse, degrees_g1 = _adjacency(g1, nodes_g1, A1)
+        # most constrained (highest degree) nodes of g1 are mapped first
+        order = np.argsort(-degrees_g1, kind='stable')
+        self.nodes_g1 = [nodes_g1[i] for i in order]
+        self.nodes_g2 = sorted(g2.nodes())
+        self.A1_sparse = A1_sparse[order][:, order]
+        self.A2_sparse, self.degrees_g2 = _adjacency(g2, self.nodes_g2, A2)
+        self.A1 = self.A1_sparse.toarray(order='C')
+        self.A2 = self.A2_sparse.toarray(order='C')
+        self.degrees_g1 = degrees_g1[order]
         self.num_nodes_g1 = g1.number_of_nodes()
         self.num_nodes_g2 = g2.number_of_nodes()
+        self.A1_bits = _pack_rows(self.A1)
+        self.A2_bits = _pack_rows(self.A2)
     
     def init_future_matching_table(self) -> np.ndarray:
         """
         Initializes the future matching table `F` based on degree constraints.
 
         A node in `g1` can only be mapped to a node in `g2` if the degree of 
-        the `g1` node is less than or equal to that of the `g2` node.
+        the `g1` node is less than or equal to that of the `g2` node, and if
+        its neighbours can be mapped to distinct neighbours of the `g2` node
+        with a degree at least as large, i.e. the descending neighbour degrees
+        of the `g1` node are dominated by the largest ones of the `g2` node.
 
         Returns:
         --------
         np.ndarray
-            A binary matrix representing initial feasible mappings.
+            The initial feasible mappings, one `uint64` bitset row per node in `g1`.
         """
-        degrees_g1 = np.array([deg for (_, deg) in sorted(self.g1.degree())])
-        degrees_g2 = np.array([deg for (_, deg) in sorted(self.g2.degree())])
-        return np.repeat(degrees_g1, self.num_nodes_g2).reshape(self.num_nodes_g1, self.num_nodes_g2) <= degrees_g2.T
+        degrees_g1 = self.degrees_g1
+        degrees_g2 = self.degrees_g2
+        F = np.less_equal.outer(degrees_g1, degrees_g2)
+
+        width = int(np.diff(self.A1_sparse.indptr).max(initial=0))
+        if width > 0:
+            neighbour_degrees_g1 = _neighbour_degrees(self.A1_sparse, degrees_g1, width)
+            neighbour_degrees_g2 = _neighbour_degrees(self.A2_sparse, degrees_g2, width)
+            # one column at a time, so the only temporary is `(n1, n2)`
+            for k in range(width):
+                F &= np.less_equal.outer(neighbour_degrees_g1[:, k], neighbour_degrees_g2[:, k])
+
+        return _pack_rows(F)
     
     def update_F(self,
                  F: np.ndarray,
@@ -69,21 +308,25 @@ class UllmanAlgorithm:
         """
         Updates the future matching table `F` by mapping `row -> col`.
 
-        This sets the entire `row` and `col` to zero except for `F[row, col] = 1`,
-        ensuring that `row` is mapped exclusively to `col`.
+        This sets `row` to zero except for `F[row, col] = 1`, ensuring that `row`
+        is mapped exclusively to `col`, and clears `col` from the unmapped rows
+        after `row`. Rows are mapped in order, so every row before `row` already
+        holds a single column other than `col` and is left untouched.
 
         Parameters:
         -----------
         F : np.ndarray
-            The current future matching table.
+            The current future matching table, as `uint64` bitset rows.
         row : int
             The row (node in `g1`) being mapped.
         col : int
             The column (node in `g2`) being assigned.
         """
+        word, bit = divmod(int(col), WORD_BITS)
+        mask = np.uint64(1) << np.uint64(bit)
+        F[row + 1:, word] &= ~mask
         F[row, :] = 0
-        F[:, col] = 0
-        F[row, col] = 1
+        F[row, word] = mask
     
     def is_F_valid_isomorphism(self,
                                F: np.ndarray) -> bool:
@@ -98,21 +341,21 @@ class UllmanAlgorithm:
         Parameters:
         -----------
         F : np.ndarray
-            The current future matching table.
+            The current future matching table, as `uint64` bitset rows.
 
         Returns:
         --------
         bool
             True if `F` is a valid isomorphism, False otherwise.
         """
-        return np.all(F.sum(axis=1) == 1) and np.all(F.sum(axis=0) <= 1)
+        bits = _unpack_rows(F)
+        return np.all(bits.sum(axis=1) == 1) and np.all(bits.sum(axis=0) <= 1)
     
     def check_constraint(self,
                          F: np.ndarray,
                          row: int,
                          col: int,
-                         unmapped_rows: List[int],
-                         unmapped_cols: List[int]) -> None:
+                         unmapped_rows: slice) -> None:
         """
         Prunes invalid mappings based on adjacency constraints.
 
@@ -120,76 +363,214 @@ class UllmanAlgorithm:
         and `wj` in `g2`, if `F[wi, wj] == 1`, then `A1[row, wi]` must match `A2[col, wj]`.
         If the constraint is violated, `F[wi, wj]` is set to 0.
 
+        With bitset rows this is a single broadcast `AND` over the unmapped rows:
+        a row keeps the neighbours of `col` if `wi` is adjacent to `row`, and its
+        non-neighbours otherwise, i.e. `A2_bits[col]` XOR-ed with an all-ones
+        word for non-adjacent rows. Column `col` itself is already cleared by
+        `update_F`.
+
         Parameters:
         -----------
         F : np.ndarray
-            The current future matching table.
+            The current future matching table, as `uint64` bitset rows.
         row : int
             The row (node in `g1`) being mapped.
         col : int
             The column (node in `g2`) being assigned.
-        unmapped_rows : List[int]
-            Indices of unmapped rows in `g1`.
-        unmapped_cols : List[int]
-            Indices of unmapped columns in `g2`.
-        """
-        for wi in unmapped_rows:
-            for wj in unmapped_cols:
-                if F[wi, wj] == 1 and (self.A1[row, wi] != self.A2[col, wj]):
-                    F[wi, wj] = 0
+        unmapped_rows : slice
+            The unmapped rows in `g1`, always the contiguous block after `row`.
+        """
+        adjacent = self.A1[row, unmapped_rows] != 0
+        flip = adjacent.astype(np.uint64) - np.uint64(1)
+        F[unmapped_rows] &= self.A2_bits[col] ^ flip[:, None]
     
-    def _ullman_recursive(self,
-                         F: np.ndarray, 
-                         row: int) -> bool:
+    def _ullman_iterative(self) -> bool:
         """
-        Recursive function implementing the Ullman subgraph isomorphism test.
+        Iterative function implementing the Ullman subgraph isomorphism test.
 
-        This function attempts to map `row` from `g1` to columns in `g2`, 
-        applying constraints and backtracking when necessary.
-
-        Parameters:
-        -----------
-        F : np.ndarray
-            The current future matching table.
-        row : int
-            The row (node in `g1`) being mapped.
+        This function maps the rows of `g1` to columns in `g2` one at a time,
+        applying constraints and backtracking when necessary. Instead of
+        recursing, it keeps an explicit stack of candidate iterators, one per
+        row: the future matching table of depth `row` is `_F_stack[row]`, and
+        each candidate is tried by copying it in place into `_F_stack[row + 1]`,
+        so no table or frame is allocated during the search.
 
         Returns:
         --------
         bool
             True if an isomorphic subgraph is found, False otherwise.
         """
-        
-        if row == self.num_nodes_g1:
-            return self.is_F_valid_isomorphism(F)
-        
-        available_columns = np.where(F[row, :] == 1)[0]
+        n1 = self.num_nodes_g1
+        F_stack = self._F_stack
+        update_F = self.update_F
+        check_constraint = self.check_constraint
 
-        for col in available_columns:
-            F_tmp = np.copy(F)
-            
-            self.update_F(F_tmp, row, col)
-            
-            unmapped_rows = range(row + 1, len(F_tmp))
-            unmapped_cols = np.setdiff1d(range(F_tmp.shape[1]), [col])
+        if n1 == 0:
+            return True
 
-            self.check_constraint(F_tmp, row, col, unmapped_rows, unmapped_cols)
+        candidates = [None] * n1
+        candidates[0] = _iter_bits(F_stack[0, 0])
+        row = 0
 
-            if np.any(np.sum(F_tmp, axis=1) == 0):
+        while row >= 0:
+            col = next(candidates[row], None)
+            if col is None:
                 # backtrack
+                row -= 1
+                continue
+
+            F_tmp = F_stack[row + 1]
+            np.copyto(F_tmp, F_stack[row])
+
+            update_F(F_tmp, row, col)
+
+            unmapped_rows = slice(row + 1, None)
+
+            check_constraint(F_tmp, row, col, unmapped_rows)
+
+            if np.any(np.bitwise_or.reduce(F_tmp[unmapped_rows], axis=1) == 0):
                 continue
-            
-            if self._ullman_recursive(F_tmp, row + 1):
+
+            row += 1
+            if row == n1:
+                # every row was mapped by `update_F` to a column no other row holds,
+                # and no row was left empty, so `F_tmp` is a valid isomorphism already
                 return True
-        
+
+            candidates[row] = _iter_bits(F_tmp[row])
+
         return False
 
+    def check_necessary_conditions(self) -> bool:
+        """
+        Checks cheap necessary conditions for `g1` to be a subgraph of `g2`.
+
+        Conditions:
+        -----------
+        - `g1` has at most as many edges as `g2`.
+        - The degree sequence of `g1`, sorted in descending order, is dominated
+          componentwise by the largest degrees of `g2`.
+
+        Returns:
+        --------
+        bool
+            False if `g1` cannot be a subgraph of `g2`, True otherwise.
+        """
+        if self.g1.number_of_edges() > self.g2.number_of_edges():
+            return False
+
+        degrees_g1 = np.sort(self.degrees_g1)[::-1]
+        degrees_g2 = np.sort(self.degrees_g2)[::-1]
+        return not np.any(degrees_g1 > degrees_g2[:self.num_nodes_g1])
+
+    def check_triangle_condition(self) -> bool:
+        """
+        Checks that `g1` has at most as many triangles as `g2`.
+
+        Counting the triangles of `g2` walks the whole target, so it is skipped
+        when `g1` has none, and `is_subgraph_isomorphic` only runs this check
+        on a cache miss. Directed graphs always pass, as `nx.triangles` is only
+        defined for undirected graphs.
+
+        Returns:
+        --------
+        bool
+            False if `g1` cannot be a subgraph of `g2`, True otherwise.
+        """
+        if self.g1.is_directed() or self.g2.is_directed():
+            return True
+
+        triangles_g1 = sum(nx.triangles(self.g1).values())
+        if triangles_g1 == 0:
+            return True
+
+        return triangles_g1 <= sum(nx.triangles(self.g2).values())
+
+    def _parallel_search(self,
+                         F: np.ndarray,
+                         roots: np.ndarray) -> bool:
+        """
+        Runs the compiled search on a thread pool, splitting the candidates of
+        the first row over `MAX_WORKERS` threads.
+
+        Each thread tries a strided slice of `roots` one after the other with a
+        single search stack. The kernel releases the GIL, and all threads share
+        one flag so that the remaining ones give up as soon as a mapping is
+        found.
+
+        Parameters:
+        -----------
+        F : np.ndarray
+            The initial future matching table, as `uint64` bitset rows.
+        roots : np.ndarray
+            The candidate columns of the first row.
+
+        Returns:
+        --------
+        bool
+            True if an isomorphic subgraph is found, False otherwise.
+        """
+        stop = np.zeros(1, dtype=np.intc)
+
+        def search_roots(worker: int) -> bool:
+            return _compiled_search(F, self.A1_bits, self.A2_bits, stop, roots[worker::MAX_WORKERS])
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            return any(executor.map(search_roots, range(MAX_WORKERS)))
+
+    def _search(self) -> bool:
+        """
+        Initializes the mapping matrix `F` and runs the Ullman search, using
+        the compiled kernel from `ullman._ullman` when the extension is built.
+
+        Large compiled searches first try a few candidates of the first row
+        serially, which settles most easy queries, and only split the rest
+        over threads when every thread gets enough of them.
+
+        Returns:
+        --------
+        bool
+            True if an isomorphic subgraph is found, False otherwise.
+        """
+        F = self.init_future_matching_table()
+
+        if _compiled_search is not None:
+            if MAX_WORKERS > 1 and self.num_nodes_g2 >= PARALLEL_MIN_NODES and self.num_nodes_g1 > 0:
+                roots = np.flatnonzero(_unpack_rows(F[0]))
+                serial, rest = roots[:PARALLEL_SERIAL_ROOTS], roots[PARALLEL_SERIAL_ROOTS:]
+                if len(rest) >= PARALLEL_MIN_ROOTS * MAX_WORKERS:
+                    if _compiled_search(F, self.A1_bits, self.A2_bits, roots=serial):
+                        return True
+                    return self._parallel_search(F, rest)
+            return _compiled_search(F, self.A1_bits, self.A2_bits)
+
+        self._F_stack = np.empty((self.num_nodes_g1 + 1,) + F.shape, dtype=np.uint64)
+        self._F_stack[0] = F
+
+        return self._ullman_iterative()
+
+    def _cache_key(self) -> Tuple[int, bytes, int, bytes]:
+        """
+        Builds the result cache key of the graph pair.
+
+        The packed adjacency matrices are reduced to fixed-size digests, so a
+        cache entry costs the same for any graph size.
+
+        Returns:
+        --------
+        Tuple[int, bytes, int, bytes]
+            The node counts and adjacency digests of `g1` and `g2`.
+        """
+        return (self.num_nodes_g1, hashlib.blake2b(self.A1_bits).digest(),
+                self.num_nodes_g2, hashlib.blake2b(self.A2_bits).digest())
+
     def is_subgraph_isomorphic(self) -> bool:
         """
         Determines whether `g1` is subgraph isomorphic to `g2`.
 
-        This function initializes the mapping matrix `F` and starts 
-        the recursive Ullman search.
+        Results are cached by digests of the packed adjacency matrices of both
+        graphs, so repeating a query on graphs with the same structure and node
+        order skips the search entirely.
 
         Returns:
         --------
@@ -198,7 +579,22 @@ class UllmanAlgorithm:
         """
         if self.num_nodes_g1 > self.num_nodes_g2:
             return False
-        
-        F = self.init_future_matching_table()
 
-        return self._ullman_recursive(F, 0)
\ No newline at end of file
+        if not self.check_necessary_conditions():
+            return False
+
+        key = self._cache_key()
+
+        with _result_cache_lock:
+            if key in _result_cache:
+                _result_cache.move_to_end(key)
+                return _result_cache[key]
+
+        result = self.check_triangle_condition() and bool(self._search())
+
+        with _result_cache_lock:
+            _result_cache[key] = result
+            if len(_result_cache) > RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+
+        return result